@@ -1,7 +1,20 @@
 import json
 import os
 import sys
-from typing import Dict, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# Row templates for the detailed summary tables (the .N precision truncates long names)
+_GROUP_ROW_FMT = "│ {name:<23.23} │ {calls:>5} │ {input_tokens:>11,} │ {output_tokens:>12,} │ {cost:>11.6f} │"
+_CALL_ROW_FMT = "│ {index:>2} │ {call_type:<12.12} │ {model:<23.23} │ {input_tokens:>11,} │ {output_tokens:>12,} │ {cost:>11.6f} │"
+_CONTEXT_ROW_FMT = "│    │ Context: {:<59} │"
+
+
+def _new_bucket() -> Dict:
+    """Empty per-model / per-operation aggregate."""
+    return {'calls': 0, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0}
 
 
 class CostTracker:
@@ -19,32 +32,125 @@ class CostTracker:
         }
     }
     
-    def __init__(self):
-        self.cost_file = '/tmp/ai_costs.json'
-        self.costs = self._load_costs()
+    # Same pricing converted to $/token once, so calculate_cost only multiplies
+    _PRICING_PER_TOKEN = {
+        model: {'input': rates['input'] / 1_000_000, 'output': rates['output'] / 1_000_000}
+        for model, rates in PRICING.items()
+    }
+    
+    def __init__(self, fresh: bool = False):
+        # Calls are appended to a JSONL log; the totals file is a small header
+        # rewritten after each call so loading never has to replay the log
+        self.cost_file = '/tmp/ai_costs.jsonl'
+        self.totals_file = '/tmp/ai_costs_totals.json'
+        self._calls = None
+        self._ts_cached_key = None
+        self._ts_cached = None
+        # A fresh tracker knows the cost files were just cleared, so skip touching them
+        self.costs = self._empty_costs() if fresh else self._load_costs()
+        if fresh:
+            self._calls = []
+    
+    @staticmethod
+    def _empty_costs() -> Dict:
+        """Initialize empty cost structure."""
+        return {
+            'total_cost': 0.0,
+            'total_calls': 0,
+            'total_input_tokens': 0,
+            'total_output_tokens': 0,
+            'by_model': defaultdict(_new_bucket),
+            'by_type': defaultdict(_new_bucket)
+        }
+    
+    @staticmethod
+    def _file_has_data(path: str) -> bool:
+        """Check that a file exists and is non-empty with a single stat call."""
+        try:
+            return os.stat(path).st_size > 0
+        except OSError:
+            return False
     
     def _load_costs(self) -> Dict:
-        """Load existing cost data or initialize empty structure."""
-        if os.path.exists(self.cost_file):
+        """Load running totals from the totals header or initialize empty structure."""
+        costs = self._empty_costs()
+        
+        if self._file_has_data(self.totals_file):
             try:
-                with open(self.cost_file, 'r') as f:
-                    return json.load(f)
+                with open(self.totals_file, 'r') as f:
+                    totals = json.load(f)
+                costs.update(totals)
+                costs['by_model'] = defaultdict(_new_bucket, totals.get('by_model', {}))
+                costs['by_type'] = defaultdict(_new_bucket, totals.get('by_type', {}))
+                return costs
             except Exception as e:
-                print(f"Warning: Could not load existing costs: {e}", file=sys.stderr)
+                print(f"Warning: Could not load cost totals, rebuilding from call log: {e}", file=sys.stderr)
+                costs = self._empty_costs()
         
-        return {
-            'total_cost': 0.0,
-            'calls': []
-        }
+        # No usable header: replay the call log once (keeping the calls, since we read them anyway)
+        self._calls = self._load_calls(costs)
+        
+        return costs
     
-    def _save_costs(self):
-        """Save cost data to file."""
+    def _load_calls(self, costs: Optional[Dict] = None) -> List[Dict]:
+        """Stream the individual call records from the call log.
+        
+        If costs is given, each record is added to those totals in the same pass.
+        """
+        calls = []
+        if not self._file_has_data(self.cost_file):
+            return calls
+        
+        try:
+            with open(self.cost_file, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    call = json.loads(line)
+                    calls.append(call)
+                    if costs is not None:
+                        self._accumulate(costs, call)
+        except Exception as e:
+            print(f"Warning: Could not load existing costs: {e}", file=sys.stderr)
+        
+        return calls
+    
+    def _get_calls(self) -> List[Dict]:
+        """Individual call records, read from the call log on first use."""
+        if self._calls is None:
+            self._calls = self._load_calls()
+        return self._calls
+    
+    @staticmethod
+    def _accumulate(costs: Dict, call: Dict):
+        """Add a single call record to the running totals."""
+        costs['total_cost'] += call['cost']
+        costs['total_calls'] += 1
+        costs['total_input_tokens'] += call['input_tokens']
+        costs['total_output_tokens'] += call['output_tokens']
+        
+        for bucket in (costs['by_model'][call['model']], costs['by_type'][call['call_type']]):
+            bucket['calls'] += 1
+            bucket['input_tokens'] += call['input_tokens']
+            bucket['output_tokens'] += call['output_tokens']
+            bucket['cost'] += call['cost']
+    
+    def _append_call(self, call_data: Dict):
+        """Append a single call record to the call log."""
         try:
-            with open(self.cost_file, 'w') as f:
-                json.dump(self.costs, f, indent=2)
+            with open(self.cost_file, 'a') as f:
+                f.write(json.dumps(call_data, separators=(',', ':')) + '\n')
         except Exception as e:
             print(f"Warning: Could not save costs: {e}", file=sys.stderr)
     
+    def _save_costs(self):
+        """Save running totals to the totals header file."""
+        try:
+            with open(self.totals_file, 'w') as f:
+                json.dump(self.costs, f, separators=(',', ':'))
+        except Exception as e:
+            print(f"Warning: Could not save cost totals: {e}", file=sys.stderr)
+    
     def extract_token_usage(self, response_data: Dict, model: str) -> Tuple[int, int]:
         """Extract input and output tokens from API response."""
         input_tokens = 0
@@ -72,13 +178,8 @@ class CostTracker:
             print(f"Warning: Unknown model {model}, cost calculation may be inaccurate", file=sys.stderr)
             return 0.0
         
-        pricing = self.PRICING[model]
-        
-        # Convert tokens to millions and calculate cost
-        input_cost = (input_tokens / 1_000_000) * pricing['input']
-        output_cost = (output_tokens / 1_000_000) * pricing['output']
-        
-        return input_cost + output_cost
+        pricing = self._PRICING_PER_TOKEN[model]
+        return input_tokens * pricing['input'] + output_tokens * pricing['output']
     
     def track_api_call(self, model: str, response_data: Dict, call_type: str = "review", 
                       context: Optional[str] = None):
@@ -95,8 +196,9 @@ class CostTracker:
             'context': context
         }
         
-        self.costs['calls'].append(call_data)
-        self.costs['total_cost'] += cost
+        if self._calls is not None:
+            self._calls.append(call_data)
+        self._accumulate(self.costs, call_data)
         
         # Log the cost information
         print(f"AI Cost Tracking - {call_type.upper()}:", file=sys.stderr)
@@ -107,136 +209,116 @@ class CostTracker:
         if context:
             print(f"  Context: {context}", file=sys.stderr)
         
+        self._append_call(call_data)
         self._save_costs()
         return cost
     
+    def has_calls(self) -> bool:
+        """Check whether any calls were tracked without building a summary."""
+        return self.costs['total_calls'] > 0
+    
     def get_summary(self) -> Dict:
         """Get cost summary for display."""
-        total_input_tokens = sum(call['input_tokens'] for call in self.costs['calls'])
-        total_output_tokens = sum(call['output_tokens'] for call in self.costs['calls'])
-        
-        # Group by model
-        by_model = {}
-        for call in self.costs['calls']:
-            model = call['model']
-            if model not in by_model:
-                by_model[model] = {
-                    'calls': 0,
-                    'input_tokens': 0,
-                    'output_tokens': 0,
-                    'cost': 0.0
-                }
-            by_model[model]['calls'] += 1
-            by_model[model]['input_tokens'] += call['input_tokens']
-            by_model[model]['output_tokens'] += call['output_tokens']
-            by_model[model]['cost'] += call['cost']
-        
-        # Group by call type
-        by_type = {}
-        for call in self.costs['calls']:
-            call_type = call['call_type']
-            if call_type not in by_type:
-                by_type[call_type] = {
-                    'calls': 0,
-                    'input_tokens': 0,
-                    'output_tokens': 0,
-                    'cost': 0.0
-                }
-            by_type[call_type]['calls'] += 1
-            by_type[call_type]['input_tokens'] += call['input_tokens']
-            by_type[call_type]['output_tokens'] += call['output_tokens']
-            by_type[call_type]['cost'] += call['cost']
-        
         return {
             'total_cost': self.costs['total_cost'],
-            'total_calls': len(self.costs['calls']),
-            'total_input_tokens': total_input_tokens,
-            'total_output_tokens': total_output_tokens,
-            'by_model': by_model,
-            'by_type': by_type,
-            'individual_calls': self.costs['calls'],
+            'total_calls': self.costs['total_calls'],
+            'total_input_tokens': self.costs['total_input_tokens'],
+            'total_output_tokens': self.costs['total_output_tokens'],
+            'by_model': dict(self.costs['by_model']),
+            'by_type': dict(self.costs['by_type']),
+            'individual_calls': self._get_calls(),
             'timestamp': self._get_timestamp()
         }
     
-    def print_detailed_summary(self):
-        """Print a detailed cost summary to stderr."""
-        summary = self.get_summary()
+    def print_detailed_summary(self, summary: Optional[Dict] = None):
+        """Print a detailed cost summary to stderr, reusing a precomputed summary if given."""
+        if summary is None:
+            summary = self.get_summary()
+        
+        # Nothing to tabulate, skip building the report entirely
+        if summary['total_calls'] == 0:
+            sys.stderr.write("No AI calls tracked\n")
+            return
+        
+        buf = []
         
         # Header with box drawing
-        print("\n┌" + "─" * 78 + "┐", file=sys.stderr)
-        print("│" + " " * 27 + "AI USAGE COST SUMMARY" + " " * 30 + "│", file=sys.stderr)
-        print("└" + "─" * 78 + "┘", file=sys.stderr)
+        buf.append("\n┌" + "─" * 78 + "┐")
+        buf.append("│" + " " * 27 + "AI USAGE COST SUMMARY" + " " * 30 + "│")
+        buf.append("└" + "─" * 78 + "┘")
         
         # Overall summary box
-        print("\nOVERALL STATISTICS", file=sys.stderr)
-        print("┌─────────────────────┬─────────────────────────────────────────────────────┐", file=sys.stderr)
-        print(f"│ Total Cost          │ ${summary['total_cost']:>53.6f} │", file=sys.stderr)
-        print(f"│ Total API Calls     │ {summary['total_calls']:>53,} │", file=sys.stderr)
-        print(f"│ Total Input Tokens  │ {summary['total_input_tokens']:>53,} │", file=sys.stderr)
-        print(f"│ Total Output Tokens │ {summary['total_output_tokens']:>53,} │", file=sys.stderr)
-        print("└─────────────────────┴─────────────────────────────────────────────────────┘", file=sys.stderr)
+        buf.append("\nOVERALL STATISTICS")
+        buf.append("┌─────────────────────┬─────────────────────────────────────────────────────┐")
+        buf.append(f"│ Total Cost          │ ${summary['total_cost']:>53.6f} │")
+        buf.append(f"│ Total API Calls     │ {summary['total_calls']:>53,} │")
+        buf.append(f"│ Total Input Tokens  │ {summary['total_input_tokens']:>53,} │")
+        buf.append(f"│ Total Output Tokens │ {summary['total_output_tokens']:>53,} │")
+        buf.append("└─────────────────────┴─────────────────────────────────────────────────────┘")
         
         # Cost by model table
         if summary['by_model']:
-            print("\nCOST BY MODEL", file=sys.stderr)
-            print("┌─────────────────────────┬───────┬─────────────┬──────────────┬─────────────┐", file=sys.stderr)
-            print("│ Model                   │ Calls │ Input Tokens│ Output Tokens│    Cost ($) │", file=sys.stderr)
-            print("├─────────────────────────┼───────┼─────────────┼──────────────┼─────────────┤", file=sys.stderr)
+            buf.append("\nCOST BY MODEL")
+            buf.append("┌─────────────────────────┬───────┬─────────────┬──────────────┬─────────────┐")
+            buf.append("│ Model                   │ Calls │ Input Tokens│ Output Tokens│    Cost ($) │")
+            buf.append("├─────────────────────────┼───────┼─────────────┼──────────────┼─────────────┤")
             
             for model, data in summary['by_model'].items():
-                model_name = model[:23] if len(model) > 23 else model
-                print(f"│ {model_name:<23} │ {data['calls']:>5} │ {data['input_tokens']:>11,} │ {data['output_tokens']:>12,} │ {data['cost']:>11.6f} │", file=sys.stderr)
+                buf.append(_GROUP_ROW_FMT.format(name=model, **data))
             
-            print("└─────────────────────────┴───────┴─────────────┴──────────────┴─────────────┘", file=sys.stderr)
+            buf.append("└─────────────────────────┴───────┴─────────────┴──────────────┴─────────────┘")
         
         # Cost by operation table
         if summary['by_type']:
-            print("\nCOST BY OPERATION", file=sys.stderr)
-            print("┌─────────────────────────┬───────┬─────────────┬──────────────┬─────────────┐", file=sys.stderr)
-            print("│ Operation               │ Calls │ Input Tokens│ Output Tokens│    Cost ($) │", file=sys.stderr)
-            print("├─────────────────────────┼───────┼─────────────┼──────────────┼─────────────┤", file=sys.stderr)
+            buf.append("\nCOST BY OPERATION")
+            buf.append("┌─────────────────────────┬───────┬─────────────┬──────────────┬─────────────┐")
+            buf.append("│ Operation               │ Calls │ Input Tokens│ Output Tokens│    Cost ($) │")
+            buf.append("├─────────────────────────┼───────┼─────────────┼──────────────┼─────────────┤")
             
             for op_type, data in summary['by_type'].items():
-                op_name = op_type[:23] if len(op_type) > 23 else op_type
-                print(f"│ {op_name:<23} │ {data['calls']:>5} │ {data['input_tokens']:>11,} │ {data['output_tokens']:>12,} │ {data['cost']:>11.6f} │", file=sys.stderr)
+                buf.append(_GROUP_ROW_FMT.format(name=op_type, **data))
             
-            print("└─────────────────────────┴───────┴─────────────┴──────────────┴─────────────┘", file=sys.stderr)
+            buf.append("└─────────────────────────┴───────┴─────────────┴──────────────┴─────────────┘")
         
         # Individual calls table
         if summary['individual_calls']:
-            print("\nINDIVIDUAL CALLS", file=sys.stderr)
-            print("┌────┬──────────────┬─────────────────────────┬─────────────┬──────────────┬─────────────┐", file=sys.stderr)
-            print("│ #  │ Operation    │ Model                   │ Input Tokens│ Output Tokens│    Cost ($) │", file=sys.stderr)
-            print("├────┼──────────────┼─────────────────────────┼─────────────┼──────────────┼─────────────┤", file=sys.stderr)
+            buf.append("\nINDIVIDUAL CALLS")
+            buf.append("┌────┬──────────────┬─────────────────────────┬─────────────┬──────────────┬─────────────┐")
+            buf.append("│ #  │ Operation    │ Model                   │ Input Tokens│ Output Tokens│    Cost ($) │")
+            buf.append("├────┼──────────────┼─────────────────────────┼─────────────┼──────────────┼─────────────┤")
             
             for i, call in enumerate(summary['individual_calls'], 1):
-                op_name = call['call_type'][:12] if len(call['call_type']) > 12 else call['call_type']
-                model_name = call['model'][:23] if len(call['model']) > 23 else call['model']
-                print(f"│ {i:>2} │ {op_name:<12} │ {model_name:<23} │ {call['input_tokens']:>11,} │ {call['output_tokens']:>12,} │ {call['cost']:>11.6f} │", file=sys.stderr)
+                buf.append(_CALL_ROW_FMT.format(index=i, **call))
                 
                 # Add context row if present
                 if call.get('context'):
                     context_text = call['context'][:59] + "..." if len(call['context']) > 59 else call['context']
-                    print(f"│    │ Context: {context_text:<59} │", file=sys.stderr)
+                    buf.append(_CONTEXT_ROW_FMT.format(context_text))
             
-            print("└────┴──────────────┴─────────────────────────┴─────────────┴──────────────┴─────────────┘", file=sys.stderr)
+            buf.append("└────┴──────────────┴─────────────────────────┴─────────────┴──────────────┴─────────────┘")
         
-        print(f"\nReport generated on {summary.get('timestamp', 'unknown time')}", file=sys.stderr)
+        buf.append(f"\nReport generated on {summary.get('timestamp', 'unknown time')}")
+        
+        sys.stderr.write("\n".join(buf) + "\n")
+        sys.stderr.flush()
     
     def _get_timestamp(self):
-        """Get current timestamp in a readable format."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        """Get current timestamp in a readable format (formatted at most once per second)."""
+        now = datetime.now().replace(microsecond=0)
+        if now != self._ts_cached_key:
+            self._ts_cached_key = now
+            self._ts_cached = now.strftime("%Y-%m-%d %H:%M:%S")
+        return self._ts_cached
     
 
 def initialize_cost_tracking():
     """Initialize cost tracking for the workflow."""
     # Clear any existing cost data for this run
-    cost_file = '/tmp/ai_costs.json'
-    if os.path.exists(cost_file):
-        os.remove(cost_file)
+    for cost_file in ('/tmp/ai_costs.jsonl', '/tmp/ai_costs_totals.json'):
+        if os.path.exists(cost_file):
+            os.remove(cost_file)
     
-    tracker = CostTracker()
+    tracker = CostTracker(fresh=True)
     print("AI cost tracking initialized", file=sys.stderr)
     return tracker
 
@@ -244,56 +326,60 @@ def initialize_cost_tracking():
 def finalize_cost_tracking():
     """Print final cost summary and save to GitHub Actions output."""
     tracker = CostTracker()
-    tracker.print_detailed_summary()
-    
     summary = tracker.get_summary()
+    tracker.print_detailed_summary(summary)
     
     # Save summary to GitHub Actions output if available
     if 'GITHUB_OUTPUT' in os.environ:
         with open(os.environ['GITHUB_OUTPUT'], 'a') as fh:
-            fh.write(f"total_ai_cost={summary['total_cost']:.6f}\n")
-            fh.write(f"total_ai_calls={summary['total_calls']}\n")
-            fh.write(f"total_input_tokens={summary['total_input_tokens']}\n")
-            fh.write(f"total_output_tokens={summary['total_output_tokens']}\n")
+            fh.write(
+                f"total_ai_cost={summary['total_cost']:.6f}\n"
+                f"total_ai_calls={summary['total_calls']}\n"
+                f"total_input_tokens={summary['total_input_tokens']}\n"
+                f"total_output_tokens={summary['total_output_tokens']}\n"
+            )
     
     # Also save a human-readable summary to a file for artifacts
     try:
+        parts = []
+        parts.append("AI USAGE COST SUMMARY\n")
+        parts.append("="*60 + "\n\n")
+        parts.append(f"Total Cost: ${summary['total_cost']:.6f}\n")
+        parts.append(f"Total API Calls: {summary['total_calls']}\n")
+        parts.append(f"Total Input Tokens: {summary['total_input_tokens']:,}\n")
+        parts.append(f"Total Output Tokens: {summary['total_output_tokens']:,}\n\n")
+        
+        parts.append("COST BY MODEL:\n")
+        parts.append("-" * 40 + "\n")
+        for model, data in summary['by_model'].items():
+            parts.append(f"{model}:\n")
+            parts.append(f"  Calls: {data['calls']}\n")
+            parts.append(f"  Input tokens: {data['input_tokens']:,}\n")
+            parts.append(f"  Output tokens: {data['output_tokens']:,}\n")
+            parts.append(f"  Cost: ${data['cost']:.6f}\n\n")
+        
+        parts.append("COST BY OPERATION:\n")
+        parts.append("-" * 40 + "\n")
+        for op_type, data in summary['by_type'].items():
+            parts.append(f"{op_type}:\n")
+            parts.append(f"  Calls: {data['calls']}\n")
+            parts.append(f"  Input tokens: {data['input_tokens']:,}\n")
+            parts.append(f"  Output tokens: {data['output_tokens']:,}\n")
+            parts.append(f"  Cost: ${data['cost']:.6f}\n\n")
+        
+        if summary['individual_calls']:
+            parts.append("INDIVIDUAL CALLS:\n")
+            parts.append("-" * 40 + "\n")
+            for i, call in enumerate(summary['individual_calls'], 1):
+                parts.append(f"{i}. {call['call_type']} - {call['model']}\n")
+                parts.append(f"   Input: {call['input_tokens']:,} tokens, Output: {call['output_tokens']:,} tokens\n")
+                parts.append(f"   Cost: ${call['cost']:.6f}\n")
+                if call.get('context'):
+                    parts.append(f"   Context: {call['context']}\n")
+                parts.append("\n")
+        
         with open('/tmp/ai_cost_summary.txt', 'w') as f:
-            f.write("AI USAGE COST SUMMARY\n")
-            f.write("="*60 + "\n\n")
-            f.write(f"Total Cost: ${summary['total_cost']:.6f}\n")
-            f.write(f"Total API Calls: {summary['total_calls']}\n")
-            f.write(f"Total Input Tokens: {summary['total_input_tokens']:,}\n")
-            f.write(f"Total Output Tokens: {summary['total_output_tokens']:,}\n\n")
-            
-            f.write("COST BY MODEL:\n")
-            f.write("-" * 40 + "\n")
-            for model, data in summary['by_model'].items():
-                f.write(f"{model}:\n")
-                f.write(f"  Calls: {data['calls']}\n")
-                f.write(f"  Input tokens: {data['input_tokens']:,}\n")
-                f.write(f"  Output tokens: {data['output_tokens']:,}\n")
-                f.write(f"  Cost: ${data['cost']:.6f}\n\n")
-            
-            f.write("COST BY OPERATION:\n")
-            f.write("-" * 40 + "\n")
-            for op_type, data in summary['by_type'].items():
-                f.write(f"{op_type}:\n")
-                f.write(f"  Calls: {data['calls']}\n")
-                f.write(f"  Input tokens: {data['input_tokens']:,}\n")
-                f.write(f"  Output tokens: {data['output_tokens']:,}\n")
-                f.write(f"  Cost: ${data['cost']:.6f}\n\n")
-            
-            if summary['individual_calls']:
-                f.write("INDIVIDUAL CALLS:\n")
-                f.write("-" * 40 + "\n")
-                for i, call in enumerate(summary['individual_calls'], 1):
-                    f.write(f"{i}. {call['call_type']} - {call['model']}\n")
-                    f.write(f"   Input: {call['input_tokens']:,} tokens, Output: {call['output_tokens']:,} tokens\n")
-                    f.write(f"   Cost: ${call['cost']:.6f}\n")
-                    if call.get('context'):
-                        f.write(f"   Context: {call['context']}\n")
-                    f.write("\n")
+            f.write("".join(parts))
     except Exception as e:
         print(f"Warning: Could not save human-readable summary: {e}", file=sys.stderr)
     
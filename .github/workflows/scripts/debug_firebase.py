@@ -18,15 +18,16 @@ def debug_firebase_operations():
     # Environment check
     print("\n1. Environment Variables:")
     firebase_env = os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
+    service_account_info = None
     print(f"   FIREBASE_SERVICE_ACCOUNT_JSON present: {firebase_env is not None}")
     if firebase_env:
         print(f"   Length: {len(firebase_env)} characters")
         try:
-            parsed = json.loads(firebase_env)
+            service_account_info = json.loads(firebase_env)
             print(f"   Valid JSON: Yes")
-            print(f"   Project ID: {parsed.get('project_id', 'NOT FOUND')}")
-            print(f"   Client Email: {parsed.get('client_email', 'NOT FOUND')}")
-            print(f"   Has private_key: {('private_key' in parsed)}")
+            print(f"   Project ID: {service_account_info.get('project_id', 'NOT FOUND')}")
+            print(f"   Client Email: {service_account_info.get('client_email', 'NOT FOUND')}")
+            print(f"   Has private_key: {('private_key' in service_account_info)}")
         except json.JSONDecodeError as e:
             print(f"   Valid JSON: No - {e}")
     
@@ -47,7 +48,8 @@ def debug_firebase_operations():
         if firebase_admin._apps:
             print("   Already initialized")
         else:
-            service_account_info = json.loads(os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON"))
+            if service_account_info is None:
+                raise ValueError("FIREBASE_SERVICE_ACCOUNT_JSON is missing or not valid JSON")
             cred = credentials.Certificate(service_account_info)
             firebase_admin.initialize_app(cred)
             print("   Initialization: OK")
@@ -71,11 +73,11 @@ def debug_firebase_operations():
     try:
         print("   Testing collection listing...")
         start_time = time.time()
-        collections = list(db.collections())
+        collection_ids = [col.id for col in db.collections()]
         elapsed = time.time() - start_time
-        print(f"   Collections found: {len(collections)} in {elapsed:.2f}s")
-        for col in collections:
-            print(f"      - {col.id}")
+        print(f"   Collections found: {len(collection_ids)} in {elapsed:.2f}s")
+        for collection_id in collection_ids:
+            print(f"      - {collection_id}")
     except Exception as e:
         elapsed = time.time() - start_time
         print(f"   Collection listing failed after {elapsed:.2f}s: {e}")
@@ -115,8 +117,11 @@ def debug_firebase_operations():
         print(f"   Test document exists: {test_doc.exists}")
         
         # Clean up
+        delete_start = time.time()
         test_ref.delete()
-        print("   Test document cleaned up")
+        delete_time = time.time() - delete_start
+        print(f"   Test document cleaned up in {delete_time:.2f}s")
+        print(f"   Test round-trip (write + read + delete) completed in {time.time() - start_time:.2f}s")
         
     except Exception as e:
         elapsed = time.time() - start_time
@@ -16,13 +16,13 @@ def main():
     """Display current cost information."""
     try:
         tracker = CostTracker()
-        summary = tracker.get_summary()
         
-        if summary['total_calls'] == 0:
+        if not tracker.has_calls():
             print("No AI calls tracked yet", file=sys.stderr)
             return
         
-        tracker.print_detailed_summary()
+        summary = tracker.get_summary()
+        tracker.print_detailed_summary(summary)
         
     except Exception as e:
         print(f"Error displaying costs: {e}", file=sys.stderr)
@@ -3,10 +3,13 @@ import json
 import sys
 import firebase_admin
 from firebase_admin import credentials, firestore
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 from config import PROJECT_NAME
 
+# Characters in image names that are not valid in Firestore document IDs
+_DOCID_TRANS = str.maketrans({'/': '_', ':': '_'})
+
 class DockerImageManager:
     def __init__(self, service_account_json=None, project_name=None):
         try:
@@ -30,17 +33,25 @@ class DockerImageManager:
             self.db = firestore.client()
             # Use the provided project name or fall back to the global config
             self.project_name = project_name if project_name is not None else PROJECT_NAME
+            self._doc_refs = {}
         except Exception as e:
             logging.error(f"Failed to initialize Firebase: {str(e)}")
             raise
     
+    def _doc_ref(self, image_name):
+        """Get the (cached) Firestore reference for an image's digest document"""
+        doc_ref = self._doc_refs.get(image_name)
+        if doc_ref is None:
+            # Convert image name to document ID (replace special characters)
+            doc_id = image_name.translate(_DOCID_TRANS)
+            doc_ref = self.db.collection(self.project_name).document('docker_images').collection('digests').document(doc_id)
+            self._doc_refs[image_name] = doc_ref
+        return doc_ref
+    
     def get_stored_digest(self, image_name):
         """Get the stored Docker image digest for a given image"""
         try:
-            # Convert image name to document ID (replace special characters)
-            doc_id = image_name.replace('/', '_').replace(':', '_')
-            
-            doc_ref = self.db.collection(self.project_name).document('docker_images').collection('digests').document(doc_id)
+            doc_ref = self._doc_ref(image_name)
             doc = doc_ref.get()
             
             if doc.exists:
@@ -68,16 +79,13 @@ class DockerImageManager:
     def update_digest(self, image_name, digest, tag="latest", repository=None, updated_by=None):
         """Update the stored Docker image digest"""
         try:
-            # Convert image name to document ID (replace special characters)
-            doc_id = image_name.replace('/', '_').replace(':', '_')
-            
-            doc_ref = self.db.collection(self.project_name).document('docker_images').collection('digests').document(doc_id)
+            doc_ref = self._doc_ref(image_name)
             
             data = {
                 'digest': digest,
                 'image_name': image_name,
                 'tag': tag,
-                'last_updated': datetime.utcnow(),
+                'last_updated': datetime.now(timezone.utc),
                 'repository': repository or os.environ.get('GITHUB_REPOSITORY', ''),
                 'updated_by': updated_by or 'monitor-agent-updates-workflow'
             }
@@ -95,8 +103,7 @@ class DockerImageManager:
         """Get recent digest update history for an image (if we implement versioning later)"""
         try:
             # For now, just return the current digest info
-            doc_id = image_name.replace('/', '_').replace(':', '_')
-            doc_ref = self.db.collection(self.project_name).document('docker_images').collection('digests').document(doc_id)
+            doc_ref = self._doc_ref(image_name)
             doc = doc_ref.get()
             
             if doc.exists:
@@ -109,15 +116,13 @@ class DockerImageManager:
             return []
     
     def list_tracked_images(self):
-        """List all Docker images being tracked"""
+        """Yield all Docker images being tracked, one at a time"""
         try:
             collection_ref = self.db.collection(self.project_name).document('docker_images').collection('digests')
-            docs = collection_ref.stream()
             
-            images = []
-            for doc in docs:
+            for doc in collection_ref.stream():
                 data = doc.to_dict()
-                images.append({
+                yield {
                     'doc_id': doc.id,
                     'image_name': data.get('image_name', ''),
                     'digest': data.get('digest', ''),
@@ -125,14 +130,10 @@ class DockerImageManager:
                     'last_updated': data.get('last_updated'),
                     'repository': data.get('repository', ''),
                     'updated_by': data.get('updated_by', '')
-                })
-            
-            print(f"Found {len(images)} tracked images in project {self.project_name}", file=sys.stderr)
-            return images
+                }
             
         except Exception as e:
             logging.error(f"Error listing tracked images: {str(e)}")
-            return []
 
 def main():
     """Main function for command line usage"""
@@ -176,9 +177,11 @@ def main():
             print("Digest updated successfully")
         
         elif command == "list_images":
-            images = manager.list_tracked_images()
-            for img in images:
+            count = 0
+            for img in manager.list_tracked_images():
+                count += 1
                 print(f"Image: {img['image_name']}, Digest: {img['digest'][:12]}..., Updated: {img['last_updated']}")
+            print(f"Found {count} tracked images in project {manager.project_name}", file=sys.stderr)
         
         else:
             print(f"Unknown command: {command}", file=sys.stderr)
@@ -1,28 +1,54 @@
 import os
 import sys
-import json
+import time
+import functools
 import firebase_admin
 from firebase_admin import credentials, firestore
 from config import PROJECT_NAME
 
+# orjson parses faster when available; the stdlib json module is the fallback
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# Seconds a fetched macros document is reused before hitting Firestore again
+MACROS_CACHE_TTL = 300
+
+# project name -> (fetch time, macros document data or None if it does not exist)
+_macros_cache = {}
+
+def initialize_firebase_app(service_account_json=None):
+    """Initialize the default Firebase Admin app if it hasn't been initialized yet."""
+    if firebase_admin._apps:
+        return
+    
+    # Use provided JSON string or get from environment variable
+    if not service_account_json:
+        service_account_json = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
+    
+    if not service_account_json:
+        raise ValueError("Firebase service account JSON not provided via parameter or FIREBASE_SERVICE_ACCOUNT_JSON environment variable")
+    
+    # Parse the JSON string into a dictionary
+    try:
+        service_account_info = _json.loads(service_account_json)
+    except _json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in Firebase service account credentials: {str(e)}")
+    
+    cred = credentials.Certificate(service_account_info)
+    firebase_admin.initialize_app(cred)
+
+@functools.lru_cache(maxsize=1)
+def get_firestore_client():
+    """Get the Firestore client shared by all scripts in this process."""
+    initialize_firebase_app()
+    return firestore.client()
+
 def initialize_firebase():
     """Initialize Firebase Admin SDK using service account JSON from environment variable."""
     try:
-        # Get the service account JSON from environment variable
-        service_account_json = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
-        
-        if not service_account_json:
-            raise ValueError("FIREBASE_SERVICE_ACCOUNT_JSON environment variable not set")
-        
-        # Parse the JSON string into a dictionary
-        try:
-            service_account_info = json.loads(service_account_json)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON in FIREBASE_SERVICE_ACCOUNT_JSON: {str(e)}")
-        
-        # Initialize Firebase Admin with the service account info
-        cred = credentials.Certificate(service_account_info)
-        firebase_admin.initialize_app(cred)
+        get_firestore_client()
         
         print("Firebase initialized successfully")
         return True
@@ -31,21 +57,35 @@ def initialize_firebase():
         print(f"Error initializing Firebase: {e}")
         return False
 
-def fetch_macros():
-    """Fetch macro configuration values from Firestore."""
+def read_macros_doc(force_refresh=False):
+    """Read the macros document from Firestore (cached for MACROS_CACHE_TTL seconds).
+    
+    Returns None if the document does not exist. Has no side effects besides the cache.
+    """
+    cached = _macros_cache.get(PROJECT_NAME)
+    if cached and not force_refresh and time.time() - cached[0] < MACROS_CACHE_TTL:
+        return cached[1]
+    
+    # Get Firestore client
+    db = get_firestore_client()
+    
+    # Get reference to macros document using the global project name
+    doc_ref = db.collection(PROJECT_NAME).document('macros').collection('settings').document('macros')
+    doc = doc_ref.get()
+    
+    macros_data = doc.to_dict() if doc.exists else None
+    _macros_cache[PROJECT_NAME] = (time.time(), macros_data)
+    return macros_data
+
+def fetch_macros(force_refresh=False):
+    """Fetch macro configuration values from Firestore and set them as GitHub Actions outputs."""
     try:
-        # Get Firestore client
-        db = firestore.client()
+        macros_data = read_macros_doc(force_refresh)
         
-        # Get reference to macros document using the global project name
-        doc_ref = db.collection(PROJECT_NAME).document('macros').collection('settings').document('macros')
-        doc = doc_ref.get()
-        
-        if not doc.exists:
+        if macros_data is None:
             print("No macros document found in Firestore")
             return None
         
-        macros_data = doc.to_dict()
         print("Successfully fetched macros from Firestore:")
         
         # Define expected macro keys with defaults
@@ -56,14 +96,16 @@ def fetch_macros():
             'IMPORTANT_CHANGE_LABELS': 'important change,important changes'
         }
         
-        # Extract values and set GitHub outputs
+        # Extract values and collect GitHub outputs
+        output_lines = []
         for key, default_value in expected_macros.items():
             value = macros_data.get(key, default_value)
             print(f"  Key: '{key}' |  Value: {value}")
-            
-            # Set GitHub Actions output
-            with open(os.environ.get('GITHUB_OUTPUT', '/dev/stdout'), 'a') as f:
-                f.write(f"{key.lower()}={value}\n")
+            output_lines.append(f"{key.lower()}={value}\n")
+        
+        # Set GitHub Actions outputs in a single write
+        with open(os.environ.get('GITHUB_OUTPUT', '/dev/stdout'), 'a') as f:
+            f.writelines(output_lines)
         
         return macros_data
         
@@ -1,55 +1,79 @@
 import os
-import json
 import sys
-import firebase_admin
-from firebase_admin import credentials, firestore
-from datetime import datetime
+import time
+from firebase_admin import firestore
 import base64
 import logging
-from fetch_macros import initialize_firebase, fetch_macros
+from concurrent.futures import ThreadPoolExecutor
+from fetch_macros import initialize_firebase_app, get_firestore_client, read_macros_doc
 from config import PROJECT_NAME
 
+# Seconds a fetched architecture summary document is reused within one client
+SUMMARY_CACHE_TTL = 30
+
+# Firestore allows at most 500 writes per batch commit
+BATCH_WRITE_LIMIT = 500
+
+# Worker threads shared by a client's concurrent Firestore requests; throughput
+# stops improving somewhere past a few dozen threads, so keep the default modest.
+# Can be overridden with the FIRESTORE_POOL environment variable.
+FIRESTORE_POOL_SIZE = 20
+
 class FirebaseClient:
     def __init__(self, service_account_json=None, project_name=None):
         try:
-            if not firebase_admin._apps:
-                # Use provided JSON string or get from environment variable
-                if not service_account_json:
-                    service_account_json = os.environ.get('FIREBASE_SERVICE_ACCOUNT_JSON')
-                
-                if not service_account_json:
-                    raise ValueError("Firebase service account JSON not provided via parameter or FIREBASE_SERVICE_ACCOUNT_JSON environment variable")
-                
-                # Parse the JSON string into a dictionary
-                try:
-                    service_account_info = json.loads(service_account_json)
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON in Firebase service account credentials: {str(e)}")
-                    
-                cred = credentials.Certificate(service_account_info)
-                firebase_admin.initialize_app(cred)
+            # Explicit credentials only matter if nothing has initialized Firebase yet
+            if service_account_json:
+                initialize_firebase_app(service_account_json)
             
-            self.db = firestore.client()
+            self.db = get_firestore_client()
             # Use the provided project name or fall back to the global config
             self.project_name = project_name if project_name is not None else PROJECT_NAME
+            # repository -> (fetch time, summary document data or None if it does not exist)
+            self._summary_cache = {}
+            self._pool = None
         except Exception as e:
             logging.error(f"Failed to initialize Firebase: {str(e)}")
             raise
     
+    @property
+    def pool(self):
+        """Thread pool shared by all concurrent Firestore operations of this client (created on first use)"""
+        if self._pool is None:
+            try:
+                pool_size = int(os.environ.get('FIRESTORE_POOL', FIRESTORE_POOL_SIZE))
+            except ValueError:
+                logging.warning(f"Invalid FIRESTORE_POOL value, using {FIRESTORE_POOL_SIZE}")
+                pool_size = FIRESTORE_POOL_SIZE
+            self._pool = ThreadPoolExecutor(max_workers=max(1, pool_size))
+        return self._pool
+    
+    def close(self):
+        """Shut down the thread pool, if one was created"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+    
+    def _get_summary_doc(self, repository):
+        """Read the architecture summary document, reusing a recent read of the same repository"""
+        cached = self._summary_cache.get(repository)
+        if cached and time.time() - cached[0] < SUMMARY_CACHE_TTL:
+            return cached[1]
+        
+        # Use project_name as the main collection path
+        doc_ref = self.db.collection(self.project_name).document('architecture_summaries').collection('summaries').document(repository.replace('/', '_'))
+        doc = doc_ref.get()
+        data = doc.to_dict() if doc.exists else None
+        self._summary_cache[repository] = (time.time(), data)
+        return data
+    
     def get_architecture_summary(self, repository):
         """Get the current architecture summary for a repository"""
         if not repository:
             return None
             
         try:
-            # Use project_name as the main collection path
-            doc_ref = self.db.collection(self.project_name).document('architecture_summaries').collection('summaries').document(repository.replace('/', '_'))
-            doc = doc_ref.get()
-            if doc.exists:
-                data = doc.to_dict()
-                return data
-            else:
-                return None
+            return self._get_summary_doc(repository)
         except Exception as e:
             logging.error(f"Error fetching architecture summary: {str(e)}")
             return None
@@ -61,34 +85,65 @@ class FirebaseClient:
             data = {
                 'repository': repository,
                 'summary': summary,
-                'last_updated': datetime.utcnow(),
+                'last_updated': firestore.SERVER_TIMESTAMP,
                 'changes_count': changes_count
             }
             
             doc_ref.set(data, merge=True)
+            # The stored document changed, so the next read must go to Firestore
+            self._summary_cache.pop(repository, None)
 
 
         except Exception as e:
             logging.error(f"Error updating architecture summary: {str(e)}")
             raise
     
+    def _change_data(self, repository, pr_number, diff, metadata=None):
+        """Build the document stored for one architecture change"""
+        return {
+            'repository': repository,
+            'pr_number': pr_number,
+            'diff': diff,
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'metadata': metadata or {}
+        }
+    
     def add_architecture_change(self, repository, pr_number, diff, metadata=None):
         """Add a new architecture change record"""
         try:
             doc_ref = self.db.collection(self.project_name).document('architecture_changes').collection('changes').document()
-            change_data = {
-                'repository': repository,
-                'pr_number': pr_number,
-                'diff': diff,
-                'timestamp': datetime.utcnow(),
-                'metadata': metadata or {}
-            }
-            doc_ref.set(change_data)
+            doc_ref.set(self._change_data(repository, pr_number, diff, metadata))
             return doc_ref.id
         except Exception as e:
             logging.error(f"Error adding architecture change: {str(e)}")
             raise
     
+    def add_architecture_changes(self, repository, changes):
+        """Add several architecture change records with batched writes
+        
+        Each change is a dict with 'pr_number', 'diff' and optionally 'metadata'.
+        Returns the new document IDs in the same order as changes.
+        
+        All changes committed in one batch share the same server timestamp, so
+        get_recent_changes returns them in no particular order relative to each other.
+        """
+        try:
+            collection_ref = self.db.collection(self.project_name).document('architecture_changes').collection('changes')
+            change_ids = []
+            
+            for start in range(0, len(changes), BATCH_WRITE_LIMIT):
+                batch = self.db.batch()
+                for change in changes[start:start + BATCH_WRITE_LIMIT]:
+                    doc_ref = collection_ref.document()
+                    batch.set(doc_ref, self._change_data(repository, change['pr_number'], change['diff'], change.get('metadata')))
+                    change_ids.append(doc_ref.id)
+                batch.commit()
+            
+            return change_ids
+        except Exception as e:
+            logging.error(f"Error adding architecture changes: {str(e)}")
+            raise
+    
     def get_recent_changes(self, repository, limit=10):
         """Get recent architecture changes for context"""
         try:
@@ -109,18 +164,19 @@ class FirebaseClient:
     
     def should_summarize(self, repository, changes_threshold=None):
         """Determine if we should regenerate the architecture summary"""
+        summary_future = None
         if changes_threshold is None:
+            # Read the summary document in the background while the threshold (macros) is fetched
+            summary_future = self.pool.submit(self._get_summary_doc, repository)
             # Get from Firebase macros or environment variable
             changes_threshold = self.get_changes_threshold()
             
         try:
-            doc_ref = self.db.collection(self.project_name).document('architecture_summaries').collection('summaries').document(repository.replace('/', '_'))
-            doc = doc_ref.get()
+            data = summary_future.result() if summary_future else self._get_summary_doc(repository)
             
-            if not doc.exists:
+            if data is None:
                 return True
             
-            data = doc.to_dict()
             changes_count = data.get('changes_count', 0)
             should_summarize = changes_count >= changes_threshold
             return should_summarize
@@ -131,8 +187,12 @@ class FirebaseClient:
     def get_changes_threshold(self):
         """Get the changes threshold from Firebase macros or environment variable"""
         try:
-            # First try to get from Firebase using the imported fetch_macros function
-            macros = fetch_macros()
+            # First try to get from Firebase (plain read, no GitHub outputs)
+            try:
+                macros = read_macros_doc()
+            except Exception as e:
+                logging.error(f"Error reading macros: {str(e)}")
+                macros = None
             
             if macros and 'CHANGES_THRESHOLD' in macros:
                 threshold = macros['CHANGES_THRESHOLD']
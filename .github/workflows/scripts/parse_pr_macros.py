@@ -3,6 +3,22 @@ import re
 import sys
 
 
+# Threshold macros, each searched separately so a malformed value cannot hide the other
+_THRESHOLD_PATTERNS = {
+    'LINE_THRESHOLD': re.compile(
+        r'\*\* Use Claude when PR has more than:\*\*\s*`([^`]+)`',
+        re.IGNORECASE | re.MULTILINE),
+    'CHANGES_THRESHOLD': re.compile(
+        r'\*\* Update architecture summary when:\*\*\s*`([^`]+)`',
+        re.IGNORECASE | re.MULTILINE),
+}
+_CUSTOM_PROMPT_RE = re.compile(
+    r'\*\* Additional prompt instructions:\*\*\s*```\s*(.*?)\s*```',
+    re.IGNORECASE | re.MULTILINE | re.DOTALL)
+_NUMBER_RE = re.compile(r'(\d+)')
+_HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+
 def parse_pr_description_macros(pr_body):
     """Parse macro configuration from PR description."""
     macros = {}
@@ -10,18 +26,12 @@ def parse_pr_description_macros(pr_body):
     if not pr_body:
         return macros
 
-    # Define patterns to match a simplified format
-    patterns = {
-        'LINE_THRESHOLD': r'\*\* Use Claude when PR has more than:\*\*\s*`([^`]+)`',
-        'CHANGES_THRESHOLD': r'\*\* Update architecture summary when:\*\*\s*`([^`]+)`'
-    }
-
-    for key, pattern in patterns.items():
-        match = re.search(pattern, pr_body, re.IGNORECASE | re.MULTILINE)
+    for key, pattern in _THRESHOLD_PATTERNS.items():
+        match = pattern.search(pr_body)
         if match:
             value = match.group(1).strip()
             # Extract just the number if it has text like "200 lines" or "5 or more files"
-            number_match = re.search(r'(\d+)', value)
+            number_match = _NUMBER_RE.search(value)
             if number_match:
                 numeric_value = number_match.group(1)
                 # Only use if it's different from defaults
@@ -30,14 +40,11 @@ def parse_pr_description_macros(pr_body):
                     macros[key] = numeric_value
 
     # Parse custom AI prompt instructions
-    custom_prompt_pattern = r'\*\* Additional prompt instructions:\*\*\s*```\s*(.*?)\s*```'
-    custom_prompt_match = re.search(
-        custom_prompt_pattern, pr_body, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    custom_prompt_match = _CUSTOM_PROMPT_RE.search(pr_body)
     if custom_prompt_match:
         custom_prompt = custom_prompt_match.group(1).strip()
         # Remove HTML comments and empty lines
-        custom_prompt = re.sub(
-            r'<!--.*?-->', '', custom_prompt, flags=re.DOTALL)
+        custom_prompt = _HTML_COMMENT_RE.sub('', custom_prompt)
         custom_prompt = '\n'.join(
             line.strip() for line in custom_prompt.split('\n') if line.strip())
         if custom_prompt:
@@ -54,15 +61,15 @@ def main():
     pr_macros = parse_pr_description_macros(pr_body)
 
     # Set GitHub Actions outputs for found macros
-    output_file = os.environ.get('GITHUB_OUTPUT', '/dev/stdout')
-    with open(output_file, 'a') as f:
-        for key, value in pr_macros.items():
-            f.write(f"pr_{key.lower()}={value}\n")
+    output_lines = [f"pr_{key.lower()}={value}\n" for key, value in pr_macros.items()]
 
     # Also output whether we found any macros in the PR description
     has_pr_macros = len(pr_macros) > 0
+    output_lines.append(f"has_pr_macros={str(has_pr_macros).lower()}\n")
+
+    output_file = os.environ.get('GITHUB_OUTPUT', '/dev/stdout')
     with open(output_file, 'a') as f:
-        f.write(f"has_pr_macros={str(has_pr_macros).lower()}\n")
+        f.writelines(output_lines)
 
 
 if __name__ == "__main__":
@@ -2,7 +2,8 @@ import os
 import json
 import sys
 import base64
-import glob
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from firebase_client import FirebaseClient
 import anthropic
 
@@ -10,49 +11,74 @@ import anthropic
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from cost_tracker import CostTracker
 
+# File extensions collected for the codebase analysis
+CODE_EXTENSIONS = frozenset({
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp',
+    '.cs', '.go', '.rs', '.rb', '.php', '.swift', '.kt', '.scala', '.clj',
+    '.html', '.sass', '.less', '.vue', '.svelte',
+    '.json', '.yaml', '.yml', '.toml', '.ini', '.conf', '.cfg',
+    '.sql', '.md', '.txt', '.sh', '.bat', '.ps1'
+})
+
+# Directory names that are never scanned for code
+EXCLUDE_DIRS = frozenset({
+    '.git', 'node_modules', '.venv', 'venv', 'env',
+    'dist', 'build', 'target', '.next', '.nuxt', '__pycache__',
+    '.cache', '.tmp', '.temp', '.log'
+})
+
+def list_top_level_directories(repository_path="."):
+    """Names of the directories directly under the repository root, from a single scandir"""
+    try:
+        with os.scandir(repository_path) as entries:
+            return {entry.name for entry in entries if entry.is_dir()}
+    except OSError as e:
+        print(f"Error listing {repository_path}: {e}", file=sys.stderr)
+        return set()
+
 
-def detect_important_project_directories(repository_path="."):
-    """Detect important project directories that should never be excluded"""
+def detect_important_project_directories(repository_path=".", top_level_dirs=None):
+    """Detect common top-level project directories (src, lib, app, ...)"""
     important_dirs = []
     common_code_dirs = ['src', 'lib', 'app', 'core', 'modules', 'packages', 'components']
     
+    if top_level_dirs is None:
+        top_level_dirs = list_top_level_directories(repository_path)
+    
     for dir_name in common_code_dirs:
-        if os.path.isdir(os.path.join(repository_path, dir_name)):
+        if dir_name in top_level_dirs:
             important_dirs.append(f'/{dir_name}/')
             print(f"Detected important project directory: {dir_name}", file=sys.stderr)
             
     return important_dirs
 
 
-def get_codebase_content(repository_path="."):
+def _read_file_section(paths):
+    """Read one file (truncated for the prompt) and format it as a codebase section"""
+    relative_path, file_path = paths
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            # Limit file size to avoid overwhelming the AI; one extra
+            # character is enough to tell whether the file was cut short
+            content = f.read(10001)
+            if len(content) > 10000:
+                content = content[:10000] + "\n... (file truncated)"
+            
+            return f"\n=== {relative_path} ===\n{content}\n"
+    except Exception as e:
+        return f"\n=== {relative_path} ===\n(Error reading file: {e})\n"
+
+
+def get_codebase_content(repository_path=".", top_level_dirs=None):
     """Collect all relevant source code files from the repository"""
-    code_content = ""
+    files_to_read = []
+    parts = []
+    important_dir_counts = Counter()
     
-    # Define file extensions to include
-    code_extensions = {
-        '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.hpp',
-        '.cs', '.go', '.rs', '.rb', '.php', '.swift', '.kt', '.scala', '.clj',
-        '.html', '.sass', '.less', '.vue', '.svelte',
-        '.json', '.yaml', '.yml', '.toml', '.ini', '.conf', '.cfg',
-        '.sql', '.md', '.txt', '.sh', '.bat', '.ps1'
-    }
-    
-    # Define patterns to exclude
-    exclude_patterns = {
-        '/.git/', '/node_modules/', '/.venv/', '/venv/', '/env/', 
-        '/dist/', '/build/', '/target/', '/.next/', '/.nuxt/',
-        '__pycache__', '.pyc', '.class', '.o', '.obj',
-        '.log', '.tmp', '.temp', '.cache', '.css'
-    }
-    
-    # Detect important directories that should never be excluded
-    important_dirs = detect_important_project_directories(repository_path)
+    # Detect important directories to report how many files were collected from each
+    important_dirs = detect_important_project_directories(repository_path, top_level_dirs)
     
-    # Remove any important directories from exclude patterns if they exist
-    for important_dir in important_dirs:
-        if important_dir in exclude_patterns:
-            exclude_patterns.remove(important_dir)
-            print(f"Removed {important_dir} from exclusion patterns", file=sys.stderr)
+    important_names = [important_dir.strip('/') for important_dir in important_dirs]
     
     try:
         print(f"Scanning repository at {repository_path} for code files...", file=sys.stderr)
@@ -61,63 +87,45 @@ def get_codebase_content(repository_path="."):
         for root, dirs, files in os.walk(repository_path):
             # Skip excluded directories
             before_count = len(dirs)
-            dirs[:] = [d for d in dirs if not any(pattern.strip('/') in d for pattern in exclude_patterns)]
+            dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
             after_count = len(dirs)
             
             if before_count != after_count:
                 skipped = before_count - after_count
                 print(f"Skipped {skipped} excluded directories in {root}", file=sys.stderr)
             
-            # Special handling: don't skip important directories
-            for important_dir in important_dirs:
-                dir_name = important_dir.strip('/')
-                if dir_name in root and not any(dir_name == d for d in dirs):
-                    print(f"Ensuring important directory is not excluded: {dir_name} in {root}", file=sys.stderr)
-                    dirs.append(dir_name)
-            
             for file in files:
                 file_path = os.path.join(root, file)
                 relative_path = os.path.relpath(file_path, repository_path)
                 
-                # Skip excluded files and check extensions
-                if any(pattern in file_path for pattern in exclude_patterns):
-                    continue
-                    
+                # Only collect files with a code extension
                 _, ext = os.path.splitext(file)
-                if ext.lower() not in code_extensions:
+                if ext.lower() not in CODE_EXTENSIONS:
                     continue
                 
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        # Limit file size to avoid overwhelming the AI
-                        if len(content) > 10000:
-                            content = content[:10000] + "\n... (file truncated)"
-                        
-                        code_content += f"\n=== {relative_path} ===\n{content}\n"
-                except Exception as e:
-                    code_content += f"\n=== {relative_path} ===\n(Error reading file: {e})\n"
+                files_to_read.append((relative_path, file_path))
+                
+                # Tally collected files per top-level important directory
+                top_level = relative_path.split(os.sep, 1)[0]
+                if top_level in important_names:
+                    important_dir_counts[top_level] += 1
+        
+        # File reads are I/O bound, so a thread pool overlaps them; map keeps walk order
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            parts = list(executor.map(_read_file_section, files_to_read))
                     
     except Exception as e:
         print(f"Error collecting codebase: {e}", file=sys.stderr)
     
-    # Generate summary statistics for important directories
-    important_dir_stats = {}
-    for important_dir in important_dirs:
-        dir_name = important_dir.strip('/')
-        dir_path = os.path.join(repository_path, dir_name)
-        if os.path.exists(dir_path):
-            file_count = sum(1 for _ in glob.glob(f"{dir_path}/**/*", recursive=True) if os.path.isfile(_))
-            important_dir_stats[dir_name] = file_count
-    
-    if important_dir_stats:
+    # Summary statistics for important directories (counted during the walk)
+    if important_names:
         print("Files collected from important directories:", file=sys.stderr)
-        for dir_name, count in important_dir_stats.items():
-            print(f"- {dir_name}: {count} files", file=sys.stderr)
+        for dir_name in important_names:
+            print(f"- {dir_name}: {important_dir_counts[dir_name]} files", file=sys.stderr)
             
-    return code_content
+    return "".join(parts)
 
-def check_project_structure():
+def check_project_structure(top_level_dirs=None):
     """Check the project structure and identify important directories"""
     common_project_structures = {
         'react': ['src', 'public', 'components'],
@@ -132,14 +140,36 @@ def check_project_structure():
     detected_structures = []
     structure_info = ""
     
+    if top_level_dirs is None:
+        top_level_dirs = list_top_level_directories(".")
+    
     for tech, dirs in common_project_structures.items():
-        matching_dirs = [d for d in dirs if os.path.isdir(d)]
+        # Nested paths (e.g. src/main/java) still need a stat, but only if their top directory exists
+        matching_dirs = [
+            d for d in dirs
+            if ('/' not in d and d in top_level_dirs)
+            or ('/' in d and d.split('/', 1)[0] in top_level_dirs and os.path.isdir(d))
+        ]
         if matching_dirs:
             detected_structures.append((tech, matching_dirs))
             structure_info += f"- Detected {tech}-like structure with directories: {', '.join(matching_dirs)}\n"
     
     return detected_structures, structure_info
 
+def decode_diff(diff_b64):
+    """Decode the base64 diff passed in DIFF_B64, returning an empty string if missing or invalid"""
+    if not diff_b64:
+        print("No DIFF_B64 found in environment", file=sys.stderr)
+        return ""
+    
+    try:
+        changes_text = base64.b64decode(diff_b64).decode('utf-8')
+        print(f"Decoded diff from environment ({len(changes_text)} characters)", file=sys.stderr)
+        return changes_text
+    except Exception as e:
+        print(f"Error decoding diff: {e}", file=sys.stderr)
+        return ""
+
 def main():
     try:
         project_name = "test"  # Hardcoded project name
@@ -148,25 +178,8 @@ def main():
         
         print(f"Summarizing architecture for project: {project_name}, repository: {repository}", file=sys.stderr)
         
-        # Check project structure
-        detected_structures, structure_info = check_project_structure()
-        if detected_structures:
-            print(f"Project structure analysis:\n{structure_info}", file=sys.stderr)
-        else:
-            print("No standard project structure detected", file=sys.stderr)
-        
-        # Get the current diff from environment variable
+        # Get the current diff from environment variable (decoded later, only if a prompt needs it)
         diff_b64 = os.environ.get('DIFF_B64', '')
-        if diff_b64:
-            try:
-                changes_text = base64.b64decode(diff_b64).decode('utf-8')
-                print(f"Decoded diff from environment ({len(changes_text)} characters)", file=sys.stderr)
-            except Exception as e:
-                print(f"Error decoding diff: {e}", file=sys.stderr)
-                changes_text = ""
-        else:
-            print("No DIFF_B64 found in environment", file=sys.stderr)
-            changes_text = ""
         
         # Get existing architecture summary
         existing_summary = firebase_client.get_architecture_summary(repository)
@@ -180,11 +193,21 @@ def main():
         # Collect the entire codebase for comprehensive architecture analysis (only for new projects)
         codebase_content = ""
         if not old_summary_text:
+            # One listing of the repository root answers every top-level directory check
+            top_level_dirs = list_top_level_directories(".")
+            
+            # Check project structure (only needed when analyzing the whole codebase)
+            detected_structures, structure_info = check_project_structure(top_level_dirs)
+            if detected_structures:
+                print(f"Project structure analysis:\n{structure_info}", file=sys.stderr)
+            else:
+                print("No standard project structure detected", file=sys.stderr)
+            
             # Prepare metadata about project structure
             detected_dirs = [dir_name for structure, dirs in detected_structures for dir_name in dirs]
             project_structure_info = f"Project structure analysis detected these important directories: {', '.join(detected_dirs)}" if detected_dirs else "No standard project structure detected"
             
-            codebase_content = get_codebase_content(".")
+            codebase_content = get_codebase_content(".", top_level_dirs)
             print(f"Collected codebase content ({len(codebase_content)} characters)", file=sys.stderr)
             
             # Add project structure information at the beginning of the codebase content
@@ -224,6 +247,9 @@ def main():
         Provide the architecture analysis below:
         """
         
+        # The whole-codebase analysis is the only path that doesn't use the diff
+        use_codebase_prompt = not old_summary_text and len(codebase_content) < 5000000
+        changes_text = "" if use_codebase_prompt else decode_diff(diff_b64)
 
 
         prompt = f"""
@@ -266,7 +292,7 @@ def main():
 
 
 
-        if not old_summary_text and len(codebase_content) < 5000000:
+        if use_codebase_prompt:
             active_prompt = prompt1
             print("Using comprehensive codebase analysis (prompt1) for new project", file=sys.stderr)
         elif old_summary_text and changes_text:
@@ -312,11 +338,16 @@ Provide the architecture analysis below:
             print("No valid input for architecture analysis, skipping", file=sys.stderr)
             return
 
-        response = client.messages.create(
+        # Stream the response so text is received while it is generated
+        with client.messages.stream(
             model="claude-sonnet-4-20250514",
             max_tokens=2000,  # Increased for more comprehensive summaries
             messages=[{"role": "user", "content": active_prompt}]
-        )
+        ) as stream:
+            chunks = []
+            for text in stream.text_stream:
+                chunks.append(text)
+            response = stream.get_final_message()
         
         # Track cost
         try:
@@ -336,7 +367,7 @@ Provide the architecture analysis below:
         except Exception as e:
             print(f"Warning: Cost tracking failed: {e}", file=sys.stderr)
         
-        architecture_summary = response.content[0].text
+        architecture_summary = "".join(chunks)
 
         # Safety check
         if not architecture_summary or len(architecture_summary.strip()) == 0: